@@ -0,0 +1,172 @@
+# Transfer search. Given bootstrap-static elements and your 15 picks, finds the best
+# single-transfer upgrades by ep_next within budget and the 3-per-club rule.
+
+import math
+import heapq
+from collections import namedtuple
+from functools import lru_cache
+from operator import itemgetter
+
+import numpy as np
+
+import fpl_kernel
+
+OK_STATUS = ("a", "d")  # buyable: available / doubtful
+
+# One suggested transfer; costs in £m
+Suggestion = namedtuple("Suggestion", "out_id in_id delta out_name in_name out_cost in_cost")
+
+@lru_cache(maxsize=2048)  # ep_next has only ~100 distinct strings across ~700 players
+def ep(v):
+    """ep_next string -> float; missing/garbage/NaN/inf count as 0.0."""
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return 0.0
+    return x if math.isfinite(x) else 0.0
+
+def build_pool(elements, team_ids):
+    """Columnar (SoA) view of elements, built once. Returns (picks, pool, seg_off):
+    picks: rows, position, cost, club, xP and pool segment, as parallel arrays over your picks;
+    pool: rows, cost, club, xP, club_open over buyable players that beat the weakest owned
+    xP in their position, one cost-sorted segment per owned position;
+    seg_off: segment s is pool[...][seg_off[s]:seg_off[s + 1]]."""
+    n = len(elements)
+    cost = np.fromiter((p["now_cost"]     for p in elements), dtype=np.int16, count=n)
+    pos  = np.fromiter((p["element_type"] for p in elements), dtype=np.int8,  count=n)
+    club = np.fromiter((p["team"]         for p in elements), dtype=np.int8,  count=n)
+    xp   = np.fromiter((ep(p["ep_next"])  for p in elements), dtype=np.float64, count=n)
+    # FPL ids are dense (1..N): a list indexed by id replaces an id -> row dict
+    row_of = [None] * (max(p["id"] for p in elements) + 1)
+    for i, p in enumerate(elements):
+        row_of[p["id"]] = i
+
+    # the picks get the same columnar layout: one small array per field
+    team_rows = np.array([row_of[pid] for pid in team_ids], dtype=np.intp)
+    own_pos, own_xp = pos[team_rows], xp[team_rows]
+    owned = np.zeros(n, dtype=bool)
+    owned[team_rows] = True
+    club_cnt = np.bincount(club[team_rows], minlength=int(club.max()) + 1)
+
+    # Candidate pool (active/doubt, not owned), sharded by position and sorted
+    # by price so each sell only has to look at the prefix it can afford
+    status = np.array([p["status"] for p in elements])
+    buyable = ~owned & np.isin(status, OK_STATUS)
+    # The squad never changes during the search, so whether a candidate's club
+    # still has room (< 3 owned) is fixed per candidate and computed here once
+    club_open = club_cnt < 3
+    # Anyone at or below the weakest owned xP in a position can never be an upgrade
+    # for that position, so each segment only keeps players above that floor.
+    # Segments are concatenated so the whole pool is five flat arrays.
+    positions, own_seg = np.unique(own_pos, return_inverse=True)
+    segs = []
+    for s, et in enumerate(positions):
+        lo = own_xp[own_seg == s].min()
+        rows = np.flatnonzero(buyable & (pos == et) & (xp > lo))
+        segs.append(rows[np.argsort(cost[rows], kind="stable")])
+    seg_off = np.zeros(len(segs) + 1, dtype=np.intp)
+    seg_off[1:] = np.cumsum([len(r) for r in segs])
+    rows = np.concatenate(segs) if segs else np.zeros(0, dtype=np.intp)
+
+    picks = (team_rows, own_pos, cost[team_rows], club[team_rows], own_xp, own_seg)
+    pool = (rows, cost[rows], club[rows], xp[rows], club_open[club[rows]])
+    return picks, pool, seg_off
+
+def _round2(a):
+    """round(x, 2) over an array, with Python's (correctly rounded) round like the ranking."""
+    return np.array([round(x, 2) for x in a.tolist()])
+
+def _ranked_hits(elements, lo, k, sell_club, sell_xp, pool):
+    """Pool indices of one sell's upgrades, ranked like the final list: delta rounded to
+    2 dp, ties in bootstrap order. lo:k is the affordable part of the sell's segment.
+    Only the part that can hold its best 3 distinct names is returned."""
+    rows, _, p_club, p_xp, p_open = pool
+    delta = p_xp[lo:k] - sell_xp
+    # selling frees a slot at the seller's club, so that club is always allowed
+    club_ok = p_open[lo:k] | (p_club[lo:k] == sell_club)
+    hits = np.flatnonzero(club_ok & (delta > 0))
+    # Only this sell's best 3 distinct names can reach the overall top 3, so partition
+    # down to the 3rd-best delta before sorting anything. Deltas within TIE of it can
+    # round to the same value, so those are kept and cut again once rounded.
+    if len(hits) > 3:
+        d = delta[hits]
+        near = hits[d > np.partition(d, -3)[-3] - fpl_kernel.TIE]
+        near_d = _round2(delta[near])
+        top = near[near_d >= np.partition(near_d, -3)[-3]]
+        if len({elements[r]["web_name"] for r in rows[lo + top].tolist()}) >= 3:
+            hits = top
+    return lo + hits[np.lexsort((rows[lo + hits], -_round2(delta[hits])))]
+
+def suggest_top3(elements, team_ids, bank):
+    """Best 3 single-transfer upgrades as Suggestion tuples, best first by delta rounded
+    to 2 dp (ties: squad order, then bootstrap order). bank is in tenths of £m, like now_cost."""
+    (team_rows, _, own_cost, own_club, own_xp, own_seg), pool, seg_off = build_pool(elements, team_ids)
+    rows, p_cost, _, p_xp, _ = pool
+
+    # Every sell's affordable prefix at once: one searchsorted per segment. A running max
+    # of xP along the cost-sorted segment then bounds each sell's delta (club rule
+    # ignored; -inf when nothing is affordable).
+    budget = own_cost.astype(np.int32) + bank
+    cut = np.zeros(len(team_rows), dtype=np.intp)
+    ub = np.empty(len(team_rows))
+    for s in range(len(seg_off) - 1):
+        lo, hi = seg_off[s], seg_off[s + 1]
+        sel = own_seg == s
+        n_ok = np.searchsorted(p_cost[lo:hi], budget[sel], side="right")
+        cut[sel] = lo + n_ok
+        xp_max = np.concatenate(([-np.inf], np.maximum.accumulate(p_xp[lo:hi])))
+        ub[sel] = xp_max[n_ok] - own_xp[sel]
+
+    # With numba installed, one compiled pass finds every sell's best 3; a sell whose
+    # 3 share a name, whose ranking rounding could change (near-tied deltas), or that
+    # numba isn't there for takes the NumPy path instead
+    fast = None
+    if fpl_kernel.top_hits is not None:
+        fast, tied = fpl_kernel.top_hits(own_seg, cut, own_club, own_xp, seg_off, *pool, 3)
+
+    # Evaluate best single-transfer upgrades under budget & 3-per-club
+    # Hits are kept as bare (delta, sell row, buy row) tuples; only the final 3 become
+    # Suggestions, so nothing is built for the dozens of pairs that don't make it
+    best = {}  # (out_name, in_name) -> (delta, sell row, buy row), de-duplicated as we go
+    floor = None  # 3rd-best delta so far, once there are 3
+    for s, (i, seg, k, sell_club, sell_xp, bound) in enumerate(zip(
+        team_rows.tolist(), own_seg.tolist(), cut.tolist(),
+        own_club.tolist(), own_xp.tolist(), ub.tolist(),
+    )):
+        # Branch and bound: a sell whose best affordable xP can't beat the current 3rd
+        # can't make the top 3 (strict, so a tie still goes through the normal path)
+        if floor is not None and round(bound, 2) < floor: continue
+        sell = elements[i]
+        hits = None
+        if fast is not None and not tied[s]:
+            hits = [j for j in fast[s].tolist() if j >= 0]
+            if len(hits) == 3 and len({elements[rows[j]]["web_name"] for j in hits}) < 3:
+                hits = None
+        if hits is None:
+            hits = _ranked_hits(elements, seg_off[seg], k, sell_club, sell_xp, pool).tolist()
+
+        names = set()
+        for j in hits:
+            r = int(rows[j])
+            cand = elements[r]
+            if cand["web_name"] in names: continue
+            names.add(cand["web_name"])
+            key = (sell["web_name"], cand["web_name"])
+            d = round(float(p_xp[j]) - sell_xp, 2)
+            if key not in best or d > best[key][0]:
+                # re-insert rather than overwrite: equal deltas then rank in the order
+                # the sells that produced them come in, not when the pair was first seen
+                best.pop(key, None)
+                best[key] = (d, i, r)
+            if len(names) == 3: break
+        if len(best) >= 3:
+            floor = heapq.nlargest(3, (t[0] for t in best.values()))[-1]
+
+    top = []
+    for d, i, r in heapq.nlargest(3, best.values(), key=itemgetter(0)):
+        sell, buy = elements[i], elements[r]
+        top.append(Suggestion(
+            sell["id"], buy["id"], d, sell["web_name"], buy["web_name"],
+            sell["now_cost"]/10.0, buy["now_cost"]/10.0,
+        ))
+    return top
@@ -0,0 +1,66 @@
+# Optional Numba kernel for the sell x candidate scan in fpl_core.suggest_top3.
+# It only pays off in a long-lived process or with a persistent NUMBA_CACHE_DIR: on a
+# fresh runner the JIT compile costs more than the whole NumPy search, so numba is not
+# in requirements.txt. Without it, top_hits is None and fpl_core uses NumPy.
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Results are ranked on deltas rounded to 2 dp. Deltas at least this far apart always
+# round apart (a cent, plus float slack), so comparing them exactly gives the same order.
+TIE = 0.011
+
+def _top_hits(own_seg, cut, own_club, own_xp, seg_off,
+              rows, cost, club, xp, club_open, k):
+    """For each sell, pool indices of its k best upgrades (best delta first, ties by
+    bootstrap row), padded with -1, and whether that order could differ once deltas are
+    rounded (two of them, or the kth and one left out, within TIE but not equal).
+    cut[s] ends the sell's affordable, cost-sorted prefix."""
+    out = np.full((own_seg.shape[0], k), -1, dtype=np.int64)
+    tied = np.zeros(own_seg.shape[0], dtype=np.bool_)
+    for s in range(own_seg.shape[0]):
+        filled = 0
+        for j in range(seg_off[own_seg[s]], cut[s]):
+            # selling frees a slot at the seller's club, so that club is always allowed
+            if not (club_open[j] or club[j] == own_club[s]):
+                continue
+            d = xp[j] - own_xp[s]
+            if d <= 0.0:
+                continue
+            # insertion into the small sorted buffer out[s, :filled]
+            at = filled
+            while at > 0:
+                prev = out[s, at - 1]
+                dp = xp[prev] - own_xp[s]
+                if dp > d or (dp == d and rows[prev] < rows[j]):
+                    break
+                at -= 1
+            if at >= k:
+                continue
+            for t in range(min(filled, k - 1), at, -1):
+                out[s, t] = out[s, t - 1]
+            out[s, at] = j
+            if filled < k:
+                filled += 1
+
+        for t in range(1, filled):
+            gap = (xp[out[s, t - 1]] - own_xp[s]) - (xp[out[s, t]] - own_xp[s])
+            if 0.0 < gap < TIE:
+                tied[s] = True
+        if filled == k and not tied[s]:
+            dk = xp[out[s, k - 1]] - own_xp[s]
+            for j in range(seg_off[own_seg[s]], cut[s]):
+                if not (club_open[j] or club[j] == own_club[s]):
+                    continue
+                d = xp[j] - own_xp[s]
+                if 0.0 < d < dk and d > dk - TIE:
+                    tied[s] = True
+                    break
+    return out, tied
+
+# No fastmath: this is compare-and-branch code, and the TIE checks rely on exact IEEE math
+top_hits = njit(cache=True)(_top_hits) if njit is not None else None
@@ -0,0 +1,192 @@
+# FPL authentication. Tries a plain-HTTP login first; if FPL refuses it (challenge page etc.),
+# falls back to a persistent Chrome profile where you log in by hand once.
+# Either way the caller gets a requests.Session carrying the auth cookies, which are also
+# saved so later runs can reuse them (saved_session) without logging in at all.
+
+import os
+import json
+import time
+import asyncio
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Optional: set to "true" to run headless after you’ve logged in once
+HEADLESS = os.environ.get("FPL_HEADLESS", "").lower() in ("1", "true", "yes")
+
+BASE = "https://fantasy.premierleague.com/api"
+LOGIN_URL = "https://users.premierleague.com/accounts/login/"
+UA   = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+PROFILE_DIR = Path.home() / ".fpl-profile"     # persistent browser profile lives here
+COOKIE_FILE = PROFILE_DIR / "cookies.json"     # last good login's cookies, reused by saved_session
+TIMEOUT = (5, 15)  # requests (connect, read) seconds: fail fast instead of hanging the job
+
+# Mild stealth tweaks for the Chrome fallback, installed on every page of the profile
+STEALTH_JS = """
+Object.defineProperty(navigator,'webdriver',{get:()=>undefined});
+window.chrome = { runtime: {} };
+Object.defineProperty(navigator,'languages',{get:()=>['en-US','en']});
+Object.defineProperty(navigator,'plugins',{get:()=>[1,2,3,4,5]});
+"""
+
+def new_session():
+    """requests.Session with our UA and a keep-alive pool. Transient FPL hiccups (429/5xx)
+    are retried with backoff; POSTs are only retried on connect errors."""
+    s = requests.Session()
+    s.headers.update({"User-Agent": UA})
+    s.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=10,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+    ))
+    return s
+
+def login_session(email: str, password: str):
+    """Log in with a plain requests.Session (csrftoken -> pl_profile cookie flow).
+    Returns the authenticated session, or None if FPL didn't accept the login."""
+    s = new_session()
+    try:
+        s.get(LOGIN_URL, timeout=TIMEOUT)
+        s.post(
+            LOGIN_URL,
+            data={
+                "csrfmiddlewaretoken": s.cookies.get("csrftoken", ""),
+                "login": email,
+                "password": password,
+                "app": "plfpl-web",
+                "redirect_uri": "https://fantasy.premierleague.com/",
+            },
+            headers={"Referer": LOGIN_URL},
+            timeout=TIMEOUT,
+        )
+        ok = "pl_profile" in s.cookies and s.get(f"{BASE}/me/", timeout=TIMEOUT).status_code == 200
+    except requests.RequestException as e:
+        print("DEBUG: HTTP login error:", e)
+        ok = False
+    if not ok:
+        print("DEBUG: HTTP login not accepted, falling back to browser.")
+        s.close()
+        return None
+    print("DEBUG: Authenticated over HTTP.")
+    save_cookies(s)
+    return s
+
+def session_from_cookies(cookies):
+    """requests.Session carrying cookies exported from the browser (Playwright cookie dicts)."""
+    s = new_session()
+    for c in cookies:
+        s.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"])
+    return s
+
+def save_cookies(s):
+    """Persist a logged-in session's cookies so the next run can skip logging in.
+    Best effort: a failure only means the next run logs in again."""
+    cookies = [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path} for c in s.cookies]
+    tmp = COOKIE_FILE.with_suffix(".tmp")
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        # created 0600 from the start: these are login credentials (a leftover tmp
+        # would keep its old mode, so start from a fresh file)
+        tmp.unlink(missing_ok=True)
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(cookies, f)
+        os.replace(tmp, COOKIE_FILE)
+    except OSError as e:
+        print("DEBUG: could not save cookies:", e)
+
+def saved_session():
+    """Session from the cookies of the last login, if FPL still accepts them (/api/me 200).
+    Returns None otherwise, so the caller logs in again."""
+    try:
+        s = session_from_cookies(json.loads(COOKIE_FILE.read_text()))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    try:
+        ok = s.get(f"{BASE}/me/", timeout=TIMEOUT).status_code == 200
+    except requests.RequestException as e:
+        print("DEBUG: saved cookies check error:", e)
+        ok = False
+    if not ok:
+        print("DEBUG: Saved cookies expired, logging in again.")
+        s.close()
+        return None
+    print("DEBUG: Authenticated with saved cookies.")
+    return s
+
+async def ensure_logged_in(ctx):
+    """Return when /api/me returns 200. If not, open login and wait for you to sign in."""
+    r = await ctx.request.get(f"{BASE}/me/")
+    if r.status == 200:
+        print("DEBUG: Already authenticated.")
+        return
+
+    # Not authenticated: open FPL site and let you log in.
+    page = await ctx.new_page()
+    print("\n=== ACTION NEEDED (first run only) ===")
+    print("A Chrome window will open. Click 'Sign in' and log in to FPL.")
+    print("If you see a 'holding' page or any challenge, complete it.")
+    print("I’ll detect login automatically and continue.\n")
+
+    await page.goto("https://fantasy.premierleague.com/", wait_until="domcontentloaded")
+
+    # Give up to 5 minutes to complete login. Poll /api/me with exponential backoff
+    # (0.25s, 0.5s, 1s, then every 2s) so a quick login/challenge is picked up at once.
+    delay, deadline = 0.25, time.monotonic() + 300
+    while time.monotonic() < deadline:
+        r = await ctx.request.get(f"{BASE}/me/")
+        if r.status == 200:
+            print("DEBUG: Auth success detected.")
+            await page.close()
+            return
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 2.0)
+
+    await page.close()
+    raise RuntimeError("Timed out waiting for manual login. Please run again and sign in in the Chrome window.")
+
+async def browser_login():
+    """Fallback path: log in through a real Chrome profile, then hand its cookies to requests
+    so the browser can be closed before any API call."""
+    # Imported here: Playwright is slow to import and most runs never get this far
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as pw:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+
+        # Persistent profile so cookies/token survive between runs
+        ctx = await pw.chromium.launch_persistent_context(
+            user_data_dir=str(PROFILE_DIR),
+            channel="chrome",              # system Chrome looks most human
+            headless=HEADLESS,             # first run: keep visible; later you can set FPL_HEADLESS=true
+            args=[
+                "--disable-blink-features=AutomationControlled",
+                "--disable-features=IsolateOrigins,site-per-process",
+            ],
+        )
+        try:
+            # One init script rather than one per tweak: each call is a CDP round-trip
+            await ctx.add_init_script(STEALTH_JS)
+
+            await ctx.set_extra_http_headers({"User-Agent": UA, "Referer": "https://fantasy.premierleague.com/"})
+
+            # Ensure we are logged in (manual once)
+            await ensure_logged_in(ctx)
+
+            # Only FPL's cookies: the profile also holds every other site used in it,
+            # and these get saved to disk
+            cookies = await ctx.cookies(["https://fantasy.premierleague.com", "https://users.premierleague.com"])
+        finally:
+            # Always close (also on errors/timeouts) so no Chrome process or temp dirs
+            # outlive the run; bounded because a wedged browser can hang close(). A close
+            # timeout is only logged, so it never masks the error that got us here.
+            try:
+                await asyncio.wait_for(ctx.close(), timeout=30)  # closes browser too
+            except asyncio.TimeoutError:
+                print("DEBUG: Browser close timed out after 30s.")
+    s = session_from_cookies(cookies)
+    save_cookies(s)
+    return s
@@ -1,187 +1,183 @@
-# Self-hosted runner + persistent Chrome profile.
-# First run may show a real Chrome window; you log in once. Cookies persist at ~/.fpl-profile.
-# Then the script fetches your team and sends top 3 single-transfer upgrades (by ep_next) to Telegram.
+# Self-hosted runner. Logs in to FPL (saved cookies, then FPL_EMAIL/FPL_PASSWORD over plain
+# HTTP, then Chrome; see fpl_login.py), reads your team, then sends top 3 single-transfer
+# upgrades (by ep_next) to Telegram.
 
 import os
+import json
+import time
 import asyncio
 from pathlib import Path
 from datetime import datetime
+from zoneinfo import ZoneInfo
 
-import pytz
 import requests
-from playwright.async_api import async_playwright
+
+from fpl_core import suggest_top3
+from fpl_login import BASE, TIMEOUT, new_session, saved_session, login_session, browser_login
+
+try:  # orjson decodes the ~2MB bootstrap-static 3-4x faster; stdlib json is the fallback
+    from orjson import loads as json_loads, dumps as json_dumps
+except ImportError:
+    json_loads = json.loads
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode()
 
 # ====== ENV (set as repo secrets) ======
-EMAIL    = os.environ["FPL_EMAIL"]          # only for your reference
-PASSWORD = os.environ["FPL_PASSWORD"]       # you'll type it in Chrome on first run if needed
+EMAIL    = os.environ["FPL_EMAIL"]          # used for the direct HTTP login
+PASSWORD = os.environ["FPL_PASSWORD"]       # (browser fallback: you type it in Chrome instead)
 TEAM_ID  = int(os.environ["FPL_TEAM_ID"])
 TG_TOKEN = os.environ["TELEGRAM_TOKEN"]
 CHAT_ID  = os.environ["TELEGRAM_CHAT_ID"]
 
-# Optional: set to "true" to run headless after you’ve logged in once
-HEADLESS = os.environ.get("FPL_HEADLESS", "").lower() in ("1", "true", "yes")
+# Optional: set to "true" to read the squad from the public picks instead of my-team, with
+# no login. Those are frozen at the last deadline: transfers made since (and the bank after
+# them) are missed, so the bot may suggest selling someone you already sold.
+PUBLIC_PICKS = os.environ.get("FPL_PUBLIC_PICKS", "").lower() in ("1", "true", "yes")
 
 # ====== CONSTS ======
-BASE = "https://fantasy.premierleague.com/api"
-UA   = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36")
-PROFILE_DIR = Path.home() / ".fpl-profile"     # persistent browser profile lives here
+IST         = ZoneInfo("Asia/Kolkata")
+BOOT_CACHE  = Path.home() / ".fpl-cache" / "bootstrap.json"  # bootstrap-static on disk
+BOOT_META   = BOOT_CACHE.with_suffix(".meta.json")            # its ETag / Last-Modified
+BOOT_TTL    = 1800                                            # seconds before revalidating
 
 def now_ist() -> str:
-    return datetime.now(pytz.timezone("Asia/Kolkata")).strftime("%d %b %H:%M")
+    return datetime.now(IST).strftime("%d %b %H:%M")
 
-def ep(v):
-    try:
-        return float(v) if v not in (None, "", "0.0") else 0.0
-    except Exception:
-        return 0.0
+TG_API = "https://api.telegram.org"
 
-def team_counts(player_ids, by_id):
-    counts = {}
-    for pid in player_ids:
-        t = by_id[pid]["team"]
-        counts[t] = counts.get(t, 0) + 1
-    return counts
+# One keep-alive pool for everything that needs no FPL login: Telegram and the public
+# FPL endpoints (tg_warmup's TLS connection is the one tg_send reuses). The logged-in
+# session from fpl_login is built the same way (new_session).
+_SESSION = new_session()
+
+def tg_warmup():
+    """Open the Telegram connection (DNS + TCP + TLS) early so the final send is one round-trip."""
+    try:
+        _SESSION.head(TG_API, timeout=TIMEOUT)
+    except requests.RequestException:
+        pass  # tg_send will just connect itself
 
 def tg_send(text: str):
-    r = requests.post(
-        f"https://api.telegram.org/bot{TG_TOKEN}/sendMessage",
-        json={"chat_id": CHAT_ID, "text": text},
-        timeout=30,
+    r = _SESSION.post(
+        f"{TG_API}/bot{TG_TOKEN}/sendMessage",
+        data=json_dumps({"chat_id": CHAT_ID, "text": text}),
+        headers={"Content-Type": "application/json"},
+        timeout=TIMEOUT,
     )
     if r.status_code != 200:
         print("Telegram error:", r.status_code, r.text)
 
-async def api_get_json(ctx, path: str):
-    """Playwright request.get wrapper with proper status handling."""
-    r = await ctx.request.get(f"{BASE}{path}")
-    if r.status != 200:
-        body = await r.text()
-        raise RuntimeError(f"GET {path} -> {r.status}: {body}")
-    return await r.json()
-
-async def ensure_logged_in(ctx):
-    """Return when /api/me returns 200. If not, open login and wait for you to sign in."""
-    r = await ctx.request.get(f"{BASE}/me/")
-    if r.status == 200:
-        print("DEBUG: Already authenticated.")
-        return
-
-    # Not authenticated: open FPL site and let you log in.
-    page = await ctx.new_page()
-    print("\n=== ACTION NEEDED (first run only) ===")
-    print("A Chrome window will open. Click 'Sign in' and log in to FPL.")
-    print("If you see a 'holding' page or any challenge, complete it.")
-    print("I’ll detect login automatically and continue.\n")
-
-    await page.goto("https://fantasy.premierleague.com/", wait_until="domcontentloaded")
-
-    # Give up to 5 minutes to complete login. Poll /api/me every 2 seconds.
-    for _ in range(150):  # 150 * 2s = 300s
-        r = await ctx.request.get(f"{BASE}/me/")
-        if r.status == 200:
-            print("DEBUG: Auth success detected.")
-            await page.close()
-            return
-        await asyncio.sleep(2)
-
-    await page.close()
-    raise RuntimeError("Timed out waiting for manual login. Please run again and sign in in the Chrome window.")
+def api_get(s, path: str):
+    """requests.Session GET with proper status handling."""
+    r = s.get(f"{BASE}{path}", timeout=TIMEOUT)
+    if r.status_code != 200:
+        raise RuntimeError(f"GET {path} -> {r.status_code}: {r.text}")
+    return json_loads(r.content)
+
+def public_team():
+    """Squad + bank from the public endpoints, no login: /entry/{id}/ gives the current
+    gameweek and last_deadline_bank, then that gameweek's picks. Shaped like my-team.
+    Returns None if the public data can't stand in for it (e.g. before GW1)."""
+    try:
+        entry = api_get(_SESSION, f"/entry/{TEAM_ID}/")
+        gw, bank = entry.get("current_event"), entry.get("last_deadline_bank")
+        if gw is None or bank is None:
+            return None
+        picks = api_get(_SESSION, f"/entry/{TEAM_ID}/event/{gw}/picks/")["picks"]
+    except (requests.RequestException, RuntimeError, KeyError) as e:
+        print("DEBUG: public picks unavailable:", e)
+        return None
+    return {"picks": picks, "transfers": {"bank": bank}}
+
+def deadline_passed(boot) -> bool:
+    """True once the next gameweek's deadline (as of this bootstrap) is behind us,
+    i.e. the copy predates the gameweek switch and its ep_next/prices are stale."""
+    for e in boot.get("events", []):
+        if e.get("is_next"):
+            return time.time() >= e.get("deadline_time_epoch", float("inf"))
+    return False
+
+def load_bootstrap():
+    """bootstrap-static via a file cache: fresh (< BOOT_TTL, same gameweek) copies skip
+    the network, stale ones are revalidated with ETag/Last-Modified so an unchanged
+    payload is a 304."""
+    cached = None
+    try:
+        age = time.time() - BOOT_CACHE.stat().st_mtime
+        cached = json_loads(BOOT_CACHE.read_bytes())
+    except (OSError, ValueError):
+        pass  # missing or unreadable: refetch from scratch
+    if cached is not None and age < BOOT_TTL and not deadline_passed(cached):
+        return cached
+
+    # Validators only for a cached body we can actually fall back on after a 304
+    headers = {}
+    if cached is not None:
+        try:
+            meta = json_loads(BOOT_META.read_bytes())
+        except (OSError, ValueError):
+            meta = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    r = _SESSION.get(f"{BASE}/bootstrap-static/", headers=headers, timeout=TIMEOUT)
+    if r.status_code == 304 and cached is not None:
+        BOOT_CACHE.touch()  # still current: restart the TTL
+        return cached
+    if r.status_code != 200:
+        raise RuntimeError(f"GET /bootstrap-static/ -> {r.status_code}: {r.text}")
+    boot = json_loads(r.content)
+
+    # Write-then-rename so a concurrent run never reads a half-written file
+    BOOT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = BOOT_CACHE.with_suffix(".tmp")
+    tmp.write_bytes(r.content)
+    os.replace(tmp, BOOT_CACHE)
+    BOOT_META.write_bytes(json_dumps({
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+    }))
+    return boot
 
 async def run_bot():
-    async with async_playwright() as pw:
-        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
-
-        # Persistent profile so cookies/token survive between runs
-        ctx = await pw.chromium.launch_persistent_context(
-            user_data_dir=str(PROFILE_DIR),
-            channel="chrome",              # system Chrome looks most human
-            headless=HEADLESS,             # first run: keep visible; later you can set FPL_HEADLESS=true
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--disable-features=IsolateOrigins,site-per-process",
-            ],
-        )
-        # Mild stealth tweaks
-        await ctx.add_init_script("""Object.defineProperty(navigator,'webdriver',{get:()=>undefined});""")
-        await ctx.add_init_script("""window.chrome = { runtime: {} };""")
-        await ctx.add_init_script("""Object.defineProperty(navigator,'languages',{get:()=>['en-US','en']});""")
-        await ctx.add_init_script("""Object.defineProperty(navigator,'plugins',{get:()=>[1,2,3,4,5]});""")
-
-        await ctx.set_extra_http_headers({"User-Agent": UA, "Referer": "https://fantasy.premierleague.com/"})
-
-        # Ensure we are logged in (manual once)
-        await ensure_logged_in(ctx)
-
-        # ----- Public players -----
-        boot = await api_get_json(ctx, "/bootstrap-static/")
-        elements = boot["elements"]
-        by_id = {p["id"]: p for p in elements}
-
-        # ----- Your team (auth) -----
-        my_team = await api_get_json(ctx, f"/my-team/{TEAM_ID}/")
-        picks = my_team["picks"]
-        bank  = int(my_team.get("transfers", {}).get("bank", 0))  # tenths of £m
-
-        team_ids = [p["element"] for p in picks]
-        pos_of   = {pid: by_id[pid]["element_type"] for pid in team_ids}
-        cost_of  = {pid: by_id[pid]["now_cost"]      for pid in team_ids}
-        club_of  = {pid: by_id[pid]["team"]          for pid in team_ids}
-        club_cnt = team_counts(team_ids, by_id)
-
-        # Candidate pool (active/doubt, not owned)
-        pool_by_pos = {1: [], 2: [], 3: [], 4: []}
-        for p in elements:
-            if p["id"] in team_ids: continue
-            if p["status"] not in ("a","d"): continue
-            pool_by_pos[p["element_type"]].append(p)
-
-        # Evaluate best single-transfer upgrades under budget & 3-per-club
-        suggestions = []
-        for sell in team_ids:
-            sell_pos  = pos_of[sell]
-            sell_cost = cost_of[sell]
-            sell_club = club_of[sell]
-            sell_xp   = ep(by_id[sell]["ep_next"])
-
-            counts = dict(club_cnt); counts[sell_club] -= 1
-            budget = bank + sell_cost
-
-            for cand in pool_by_pos[sell_pos]:
-                buy_cost = cand["now_cost"]
-                if buy_cost > budget: continue
-                buy_club = cand["team"]
-                if counts.get(buy_club, 0) + 1 > 3: continue
-                delta = ep(cand["ep_next"]) - sell_xp
-                if delta <= 0: continue
-                suggestions.append({
-                    "out_name": by_id[sell]["web_name"],
-                    "in_name":  cand["web_name"],
-                    "delta":    round(delta, 2),
-                    "out_cost": sell_cost/10.0,
-                    "in_cost":  buy_cost/10.0
-                })
-
-        suggestions.sort(key=lambda x: x["delta"], reverse=True)
-        seen, top3 = set(), []
-        for s in suggestions:
-            key = (s["out_name"], s["in_name"])
-            if key in seen: continue
-            seen.add(key); top3.append(s)
-            if len(top3) == 3: break
-
-        if not top3:
-            tg_send(f"({now_ist()}) No positive xP single-transfer upgrades found.")
-        else:
-            lines = [f"({now_ist()}) Top single-transfer upgrades by xP:"]
-            for i, s in enumerate(top3, 1):
-                lines.append(
-                    f"{i}. {s['out_name']} → {s['in_name']} "
-                    f"(ΔxP +{s['delta']}, £{s['out_cost']:.1f}m → £{s['in_cost']:.1f}m)"
-                )
-            tg_send("\n".join(lines))
-
-        await ctx.close()  # closes browser too
+    # bootstrap-static is public: load it (usually from cache) while we fetch the squad,
+    # and get the Telegram handshake out of the way at the same time
+    boot_task = asyncio.create_task(asyncio.to_thread(load_bootstrap))
+    tg_task   = asyncio.create_task(asyncio.to_thread(tg_warmup))
+
+    # my-team (live squad and bank) needs a login; the public picks are opt-in, and we
+    # still log in when they can't be used
+    my_team = await asyncio.to_thread(public_team) if PUBLIC_PICKS else None
+    if my_team is None:
+        # Cookies from the last login usually still work; only log in (and only start
+        # Chrome) when FPL rejects them
+        sess = await asyncio.to_thread(saved_session)
+        if sess is None:
+            sess = await asyncio.to_thread(login_session, EMAIL, PASSWORD)
+        if sess is None:
+            sess = await browser_login()
+        with sess:
+            my_team = await asyncio.to_thread(api_get, sess, f"/my-team/{TEAM_ID}/")
+    boot = await boot_task
+    await tg_task
+
+    bank     = int(my_team.get("transfers", {}).get("bank", 0))  # tenths of £m
+    team_ids = [p["element"] for p in my_team["picks"]]
+    top3 = suggest_top3(boot["elements"], team_ids, bank)
+
+    if not top3:
+        text = f"({now_ist()}) No positive xP single-transfer upgrades found."
+    else:
+        lines = [f"({now_ist()}) Top single-transfer upgrades by xP:"]
+        for i, s in enumerate(top3, 1):
+            lines.append(
+                f"{i}. {s.out_name} → {s.in_name} "
+                f"(ΔxP +{s.delta}, £{s.out_cost:.1f}m → £{s.in_cost:.1f}m)"
+            )
+        text = "\n".join(lines)
+    tg_send(text)
 
 def main():
     asyncio.run(run_bot())
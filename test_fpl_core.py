@@ -0,0 +1,75 @@
+# Checks suggest_top3 against a plain re-statement of the original search: every sell x
+# every buyable player, rounded deltas sorted (stably), first 3 distinct (out, in) names.
+
+import random
+from operator import attrgetter
+
+import pytest
+
+import fpl_kernel
+from fpl_core import OK_STATUS, Suggestion, ep, suggest_top3
+
+def reference_top3(elements, team_ids, bank):
+    by_id = {p["id"]: p for p in elements}
+    club_cnt = {}
+    for pid in team_ids:
+        club_cnt[by_id[pid]["team"]] = club_cnt.get(by_id[pid]["team"], 0) + 1
+
+    suggestions = []
+    for pid in team_ids:
+        sell = by_id[pid]
+        sell_xp = ep(sell["ep_next"])
+        for cand in elements:
+            if cand["id"] in team_ids or cand["status"] not in OK_STATUS: continue
+            if cand["element_type"] != sell["element_type"]: continue
+            if cand["now_cost"] > bank + sell["now_cost"]: continue
+            if club_cnt.get(cand["team"], 0) + (cand["team"] != sell["team"]) > 3: continue
+            d = ep(cand["ep_next"]) - sell_xp
+            if d <= 0: continue
+            suggestions.append(Suggestion(
+                sell["id"], cand["id"], round(d, 2), sell["web_name"], cand["web_name"],
+                sell["now_cost"]/10.0, cand["now_cost"]/10.0,
+            ))
+    suggestions.sort(key=attrgetter("delta"), reverse=True)
+
+    seen, top = set(), []
+    for s in suggestions:
+        if (s.out_name, s.in_name) in seen: continue
+        seen.add((s.out_name, s.in_name))
+        top.append(s)
+        if len(top) == 3: break
+    return top
+
+def random_game(seed, decimals):
+    """A small random bootstrap: few clubs and a short name list, so club limits,
+    repeated web_names and equal deltas all come up often."""
+    rnd = random.Random(seed)
+    n = rnd.randint(40, 300)
+    names = [f"P{i}" for i in range(rnd.randint(15, 60))]
+    elements = [{
+        "id": i + 1,
+        "web_name": rnd.choice(names),
+        "element_type": rnd.randint(1, 4),
+        "team": rnd.randint(1, 8),
+        "now_cost": rnd.randint(40, 130),
+        "status": rnd.choice("aaaaaddiu"),
+        "ep_next": rnd.choice([f"{rnd.uniform(0, 9):.{decimals}f}"] * 8 + [None, "", "0.0", "nan", "inf"]),
+    } for i in range(n)]
+    # a legal squad: at most 3 per club
+    team_ids, per_club = [], {}
+    for p in rnd.sample(elements, n):
+        if len(team_ids) < 15 and per_club.get(p["team"], 0) < 3:
+            per_club[p["team"]] = per_club.get(p["team"], 0) + 1
+            team_ids.append(p["id"])
+    return elements, team_ids, rnd.randint(0, 40)
+
+@pytest.mark.parametrize("use_kernel", [True, False], ids=["kernel", "numpy"])
+@pytest.mark.parametrize("decimals", [1, 3])
+def test_matches_reference(monkeypatch, use_kernel, decimals):
+    if not use_kernel:
+        monkeypatch.setattr(fpl_kernel, "top_hits", None)
+    elif fpl_kernel.top_hits is None:
+        pytest.skip("numba not installed")
+    for seed in range(400):
+        elements, team_ids, bank = random_game(seed, decimals)
+        assert suggest_top3(elements, team_ids, bank) == reference_top3(elements, team_ids, bank), seed